@@ -1,38 +1,101 @@
+from contextlib import contextmanager
 from functools import wraps
+import inspect
+import threading
 import time
 
+from airflow_run.utils import flush_logs
+
+MAX_RETRY_INTERVAL = 30
+
+_retry_state = threading.local()
+
+
+@contextmanager
+def stop_retries_on(event):
+    """Make retry loops in the current thread give up once `event` is set.
+
+    Args:
+        event (threading.Event): set to abort pending retries.
+    """
+    previous = getattr(_retry_state, 'stop_event', None)
+    _retry_state.stop_event = event
+    try:
+        yield
+    finally:
+        _retry_state.stop_event = previous
+
+
+def _wait(interval, stop_event):
+    """Sleep between retries; True when `stop_event` was set meanwhile."""
+    if stop_event is None:
+        time.sleep(interval)
+        return False
+    return stop_event.wait(interval)
+
 
 def retry(max_retries, retry_message=''):
     def retry_fn_sub_decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kargs):
-            success = False
-            err_msg = ''
-            retry = 0
-            fib_num_a = 1
+            fib_num_a = 0
             fib_num_b = 1
+            stop_event = getattr(_retry_state, 'stop_event', None)
 
-            while success is False and retry <= max_retries:
+            for retry in range(max_retries + 1):
                 try:
-                    response = fn(*args, **kargs)
-                    success = True
+                    return fn(*args, **kargs)
                 except Exception as err:
-                    err_msg = str(err)
+                    flush_logs()
                     if retry_message:
                         print(retry_message)
                     else:
-                        print(err_msg)
-                    success = False
-                new_interval = fib_num_b + fib_num_a
-                fib_num_a = fib_num_b
-                time.sleep(new_interval)
-                fib_num_b = new_interval
-                retry += 1
-
-            if retry > max_retries:
-                raise Exception(err_msg)
-            return response
+                        print(str(err))
+                    if retry == max_retries or (
+                            stop_event is not None and stop_event.is_set()):
+                        raise
+                    error = err
+                if _wait(min(fib_num_b, MAX_RETRY_INTERVAL), stop_event):
+                    raise error
+                fib_num_a, fib_num_b = fib_num_b, fib_num_a + fib_num_b
 
         return wrapper
 
     return retry_fn_sub_decorator
+
+
+def service_start(suffix_offset=0):
+    """Shared preamble of the AirflowRun.start_* service methods.
+
+    Suffixes the `name` argument with the number of running containers of
+    that name and checks the database and rabbitmq connections, then calls
+    the wrapped method with the final `name` and the keyword-only
+    `running_count`, which is hidden from the public signature.
+
+    Args:
+        suffix_offset (int): added to the running count in the suffix.
+    """
+    def service_start_sub_decorator(fn):
+        signature = inspect.signature(fn)
+        public_signature = signature.replace(parameters=[
+            p for p in signature.parameters.values()
+            if p.name != 'running_count'])
+
+        @wraps(fn)
+        def wrapper(self, *args, **kargs):
+            bound = public_signature.bind(self, *args, **kargs)
+            bound.apply_defaults()
+            name = bound.arguments['name']
+            running_count = self._running_counts().get(name, 0)
+            if running_count:
+                bound.arguments['name'] = '{}_{}'.format(
+                    name, running_count + suffix_offset)
+            self.check_required_connections(
+                [self.check_db_connection, self.check_rabbitmq_connection])
+            return fn(
+                *bound.args, running_count=running_count, **bound.kwargs)
+
+        wrapper.__signature__ = public_signature
+        return wrapper
+
+    return service_start_sub_decorator
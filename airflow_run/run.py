@@ -1,15 +1,91 @@
 import argparse
-import docker
-import pika
+import atexit
+from collections import Counter
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import hashlib
 import os
+import pickle
 import socket
-from sqlalchemy import create_engine
+import threading
 import time
-import yaml
 
 from airflow_run.decorators import retry
+from airflow_run.decorators import service_start
+from airflow_run.decorators import stop_retries_on
+from airflow_run.utils import cached_property
 from airflow_run.utils import logger_factory
-from cryptography.fernet import Fernet
+from airflow_run.utils import safe_dump
+from airflow_run.utils import safe_load
+
+# Bump when validate_yaml changes so configs cached by older versions are
+# parsed and validated again.
+_CONFIG_CACHE_VERSION = 1
+
+# Seconds a successful connection check is trusted before re-checking.
+CONNECTION_CHECK_TTL = 30
+
+_REQUIRED_KEYS = frozenset({
+    'env', 'private_registry', 'registry_url',
+    'repository', 'image', 'tag', 'username', 'password', 'local_dir',
+    'webserver_port', 'flower_port', 'rabbitmq', 'postgresql'})
+_REQUIRED_MQ_KEYS = frozenset({
+    'name', 'username', 'password', 'host', 'virtual_host', 'image',
+    'home', 'ui_port', 'port'})
+_REQUIRED_DB_KEYS = frozenset({
+    'name', 'username', 'password', 'host', 'image', 'data', 'port',
+    'env'})
+
+
+def _is_port(value) -> bool:
+    """Accept ints and digit strings, but not booleans."""
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (
+        isinstance(value, str) and value.isdigit())
+
+
+_MAPPING = (lambda value: isinstance(value, dict), 'a mapping')
+_BOOLEAN = (lambda value: isinstance(value, bool), 'a boolean')
+_PORT = (_is_port, 'a port number')
+
+# (section, required keys, {key: (check, description)}) for validate_yaml.
+_CONFIG_SCHEMA = (
+    (None, _REQUIRED_KEYS, {
+        'env': _MAPPING, 'private_registry': _BOOLEAN,
+        'webserver_port': _PORT, 'flower_port': _PORT,
+        'rabbitmq': _MAPPING, 'postgresql': _MAPPING}),
+    ('rabbitmq', _REQUIRED_MQ_KEYS, {
+        'ui_port': _PORT, 'port': _PORT}),
+    ('postgresql', _REQUIRED_DB_KEYS, {
+        'port': _PORT, 'env': _MAPPING}),
+)
+
+
+def _config_cache_path(path: str) -> str:
+    """Path of the pickle cache for a config file.
+
+    Args:
+        path (str): path to config.yaml file.
+
+    Returns:
+        str: cache file path, one per absolute config path.
+    """
+    cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    digest = hashlib.blake2b(
+        os.path.abspath(path).encode(), digest_size=8).hexdigest()
+    return os.path.join(cache_home, 'airflow_run', digest + '.pkl')
+
+
+@lru_cache(maxsize=None)
+def _resolve_ip() -> str:
+    """Resolve the IP address of this host once per process."""
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except OSError:
+        return '127.0.0.1'
 
 
 class AirflowRun(object):
@@ -21,96 +97,200 @@ class AirflowRun(object):
             log (boolean): True for showing logs.
         """
 
-        try:
-            self._hostname = socket.gethostname()
-            self._ip = socket.gethostbyname(self._hostname)
-        except Exception as err:
-            self._hostname = 'localhost'
-            self._ip = socket.gethostbyname(self._hostname)
         self._show_log = log
-        self._logger = logger_factory()
+        self._logger = logger_factory(__name__)
         self.supported_services = [
             'flower', 'initdb', 'postgresql', 'postgres', 'rabbitmq',
             'scheduler', 'webserver', 'worker', 'list', 'airflow_scheduler',
-            'airflow_webserver', 'airflow_worker', 'all']
-        with open(os.path.realpath(config), "r") as ymlfile:
-            self.config = yaml.safe_load(ymlfile)
-            self.client = docker.from_env()
-            self.validate_yaml()
-            if self.config['private_registry'] and self.config['username'] \
-                    and self.config['password']:
-                self.client.login(
-                    registry=self.config['registry_url'],
-                    username=self.config['username'],
-                    password=self.config['password'])
+            'airflow_webserver', 'airflow_worker', 'airflow_flower', 'all']
+        self._supported = frozenset(self.supported_services)
+        self._mq_conn = None
+        self._db_ok_until = 0
+        self._mq_ok_until = 0
+        atexit.register(self._close_mq)
+        self._load_config(config)
+        pg = self.config['postgresql']
+        mq = self.config['rabbitmq']
+        self._pg_url = (
+            f"postgresql+psycopg2://{pg['username']}:{pg['password']}"
+            f"@{pg['host']}:{pg['port']}/postgres")
+        self._celery_backend_url = (
+            f"db+postgresql://{pg['username']}:{pg['password']}"
+            f"@{pg['host']}:{pg['port']}/postgres")
+        self._broker_url = (
+            f"pyamqp://{mq['username']}:{mq['password']}"
+            f"@{mq['host']}:{mq['port']}/{mq['virtual_host']}")
+        self._repository_ref = (
+            f"{self.config['registry_url']}/{self.config['repository']}")
+        self._image_ref = f"{self._repository_ref}:{self.config['tag']}"
+        self._pg_image_ref = f"{pg['image']}:{pg.get('tag', 'latest')}"
+        self._snapshot_names = self._supported | {pg['name'], mq['name']}
+        self._pg_env = tuple(f"{k}={v}" for k, v in pg['env'].items())
+        self._mq_env = tuple(
+            f"{k}={v}" for k, v in mq.get('env', {}).items())
+        self._full_env = self._build_environment()
+        self._logged_in = False
+        self._initdb_done = False
+
+    @cached_property
+    def client(self):
+        """Docker client, connected to the daemon on first use."""
+        import docker
+        return docker.from_env()
+
+    def connect(self):
+        """Connect to the docker daemon now instead of on first use.
+
+        Returns:
+            docker.DockerClient: the docker client.
+        """
+        return self.client
+
+    @property
+    def _ip(self) -> str:
+        """IP address of this host, resolved on first use."""
+        return _resolve_ip()
+
+    def _load_config(self, path: str):
+        """Load and validate config yaml file, going through a pickle cache.
+
+        The validated config is pickled under $XDG_CACHE_HOME/airflow_run
+        (default ~/.cache/airflow_run) together with the mtime and size of
+        the yaml file, and reused without parsing or validating as long as
+        both match. Set AIRFLOWRUN_NO_CACHE to always parse the yaml file.
+
+        Args:
+            path (str): path to config.yaml file.
+        """
+        stat = os.stat(path)
+        key = (_CONFIG_CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+        cache_path = _config_cache_path(path)
+        use_cache = not os.getenv('AIRFLOWRUN_NO_CACHE')
+        if use_cache:
+            try:
+                with open(cache_path, 'rb') as fr:
+                    cached = pickle.load(fr)
+                if cached['key'] == key:
+                    self.config = cached['data']
+                    return
+            except Exception:
+                pass
+        with open(path, 'rb') as ymlfile:
+            self.config = safe_load(ymlfile.read())
+        self.validate_yaml()
+        if use_cache:
+            tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+            try:
+                os.makedirs(
+                    os.path.dirname(cache_path), mode=0o700, exist_ok=True)
+                # The config holds passwords: keep the file private no
+                # matter the umask or the mode of an existing directory.
+                fd = os.open(
+                    tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, 'wb') as fw:
+                    pickle.dump({'key': key, 'data': self.config}, fw,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
 
     def validate_yaml(self):
         """Validate config yaml file
         """
-        required_keys = [
-            'env', 'private_registry', 'registry_url',
-            'repository', 'image', 'tag', 'username', 'password', 'local_dir',
-            'webserver_port', 'flower_port', 'rabbitmq', 'postgresql']
-        for key in required_keys:
-            assert key in self.config, (
-                'key "{}" is not found in yaml.').format(key)
-        required_mq_keys = [
-            'name', 'username', 'password', 'host', 'virtual_host', 'image',
-            'home', 'ui_port', 'port']
-        for key in required_mq_keys:
-            assert key in self.config['rabbitmq'], (
-                'key "{}" is not found in yaml.').format(key)
-        required_db_keys = [
-            'name', 'username', 'password', 'host', 'image', 'data', 'port',
-            'env']
-        for key in required_db_keys:
-            assert key in self.config['postgresql'], (
-                'key "{}" is not found in yaml.'.format(key))
+        if not isinstance(self.config, dict):
+            raise ValueError('yaml config must be a mapping.')
+        for section, required_keys, checks in _CONFIG_SCHEMA:
+            config = self.config if section is None else self.config[section]
+            where = ' section "{}"'.format(section) if section else ''
+            missing = required_keys - config.keys()
+            if missing:
+                raise ValueError('keys {} are not found in yaml{}.'.format(
+                    sorted(missing), where))
+            for key, (check, description) in checks.items():
+                if not check(config[key]):
+                    raise ValueError('key "{}" in yaml{} must be {}.'.format(
+                        key, where, description))
+
+    @cached_property
+    def _db_url(self) -> str:
+        """SQLAlchemy url of the airflow metadata database."""
+        env = self.config['env']
+        db_string = env.get('AIRFLOW__CORE__SQL_ALCHEMY_CONN')
+        result_backend = env.get(
+            'AIRFLOW__CELERY__RESULT_BACKEND')
+        if not db_string or not result_backend:
+            db_string = self._pg_url
+        return db_string
+
+    @cached_property
+    def _db_engine(self):
+        """SQLAlchemy engine shared by every database connection check."""
+        from sqlalchemy import create_engine
+        return create_engine(
+            self._db_url, pool_size=1, max_overflow=0, pool_pre_ping=True,
+            pool_use_lifo=True, connect_args={'connect_timeout': 5})
 
     @retry(7, 'Checking Postgresql connection...')
     def check_db_connection(self) -> bool:
         """Check if postgresql can be connected.
         Bubble up exception when fails.
         """
+        if time.monotonic() < self._db_ok_until:
+            return True
         if self._show_log:
             self._logger.info('Checking DB connection...')
-        env = self.config['env']
-        db_string = env.get('AIRFLOW__CORE__SQL_ALCHEMY_CONN')
-        result_backend = env.get(
-            'AIRFLOW__CELERY__RESULT_BACKEND')
-        if not db_string or not result_backend:
-            db_string = (
-                "postgresql+psycopg2://{}:{}@{}:{}/postgres").format(
-                self.config['postgresql']['username'],
-                self.config['postgresql']['password'],
-                self.config['postgresql']['host'],
-                self.config['postgresql']['port'])
-        engine = create_engine(db_string, connect_args={'connect_timeout': 20})
-        engine.table_names()
+        from sqlalchemy import text
+        with self._db_engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        self._db_ok_until = time.monotonic() + CONNECTION_CHECK_TTL
         self._logger.debug('Database connection is: OK')
         return True
 
+    @cached_property
+    def _mq_params(self):
+        """pika connection parameters for the rabbitmq broker."""
+        import pika
+        mq = self.config['rabbitmq']
+        credentials = pika.PlainCredentials(mq['username'], mq['password'])
+        return pika.ConnectionParameters(
+            host=mq['host'],
+            port=mq['port'],
+            virtual_host=mq['virtual_host'],
+            credentials=credentials,
+            heartbeat=0,
+            socket_timeout=5,
+            blocked_connection_timeout=5)
+
+    def _close_mq(self):
+        """Close the cached rabbitmq connection if it is still open."""
+        if self._mq_conn is not None and self._mq_conn.is_open:
+            self._mq_conn.close()
+        self._mq_conn = None
+
     @retry(7, 'Checking Rabbitmq connection...')
     def check_rabbitmq_connection(self) -> bool:
-        """Check Rabbitmq connection."""
-
-        credentials = pika.PlainCredentials(
-            self.config['rabbitmq']['username'],
-            self.config['rabbitmq']['password'])
-        parameters = pika.ConnectionParameters(
-            host=self.config['rabbitmq']['host'],
-            port=self.config['rabbitmq']['port'],
-            virtual_host=self.config['rabbitmq']['virtual_host'],
-            credentials=credentials)
-        connection = pika.BlockingConnection(parameters)
-        if connection.is_open:
+        """Check Rabbitmq connection.
+        The connection is kept open and reused by later checks.
+        """
+        if time.monotonic() < self._mq_ok_until:
+            return True
+        if self._mq_conn is not None and self._mq_conn.is_open:
+            try:
+                self._mq_conn.process_data_events(time_limit=0)
+            except Exception:
+                self._mq_conn = None
+        if self._mq_conn is None or not self._mq_conn.is_open:
+            import pika
+            self._mq_conn = pika.BlockingConnection(self._mq_params)
+        if self._mq_conn.is_open:
+            self._mq_ok_until = time.monotonic() + CONNECTION_CHECK_TTL
             self._logger.debug('Rabbitmq connection is: OK')
-            connection.close()
             return True
         raise Exception('Fail to connect to Rabbitmq.')
 
     def check_required_connections(self, funcs) -> bool:
-        """Check required connections.
+        """Check required connections concurrently.
 
         Args:
             funcs (list): list of references to check methods.
@@ -120,17 +300,90 @@ class AirflowRun(object):
             bool: True if all tests pass.
         """
         test_pass = True
-        for func in funcs:
-            test_pass &= func()
+        if not funcs:
+            return test_pass
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(funcs))
+        futures = [
+            executor.submit(self._run_check, func, stop) for func in funcs]
+        try:
+            for future in as_completed(futures):
+                test_pass &= future.result()
+        finally:
+            # On the first failure, stop the other checks from retrying and
+            # return without waiting for them.
+            stop.set()
+            executor.shutdown(wait=False)
         return test_pass
 
-    def pull(self):
-        """Pull image"""
-        os.system('docker pull {image}:{tag}'.format(
-            image="{registry_url}/{repository}".format(
-                registry_url=self.config['registry_url'],
-                repository=self.config['repository']),
-            tag=self.config['tag']))
+    @staticmethod
+    def _run_check(func, stop):
+        """Run a connection check whose retries give up once `stop` is set.
+
+        Args:
+            func (callable): connection check.
+            stop (threading.Event): set when another check failed.
+        """
+        with stop_retries_on(stop):
+            return func()
+
+    def pull(self, force: bool = False):
+        """Pull image
+
+        Args:
+            force (bool[optional]): True for pulling even if the image is
+                already present locally.
+        """
+        self._ensure_registry_login()
+        self._pull_image(self._repository_ref, self.config['tag'], force=force)
+
+    def _ensure_registry_login(self):
+        """Log in to the private registry once, when credentials are set."""
+        if self._logged_in:
+            return
+        if self.config['private_registry'] and self.config['username'] \
+                and self.config['password']:
+            self.client.login(
+                registry=self.config['registry_url'],
+                username=self.config['username'],
+                password=self.config['password'])
+        self._logged_in = True
+
+    def _pull_image(self, repository: str, tag: str, force: bool = False):
+        """Pull an image unless it is already present locally.
+
+        Set `always_pull: True` in the config to check the registry on
+        every run (e.g. to pick up a moving `latest` tag).
+
+        Args:
+            repository (str): image repository.
+            tag (str): image tag.
+            force (bool[optional]): True for pulling even if the image is
+                already present locally.
+        """
+        import docker
+        if not force and not self.config.get('always_pull', False):
+            try:
+                self.client.images.get(f'{repository}:{tag}')
+                return
+            except docker.errors.ImageNotFound:
+                pass
+        self._consume_progress(self.client.api.pull(
+            repository, tag=tag, stream=True, decode=True))
+
+    def _consume_progress(self, events):
+        """Log a decoded docker pull/push progress stream as it arrives.
+
+        Args:
+            events (iterable): decoded JSON progress events.
+        """
+        for event in events:
+            if 'error' in event:
+                raise Exception(event['error'])
+            if 'status' in event:
+                self._logger.debug(' '.join(
+                    str(event[k]) for k in ('id', 'status', 'progress')
+                    if k in event))
 
     def build(self, dockerfile: str):
         """Build and push airflow docker image
@@ -142,19 +395,16 @@ class AirflowRun(object):
             raise Exception(
                 'Private registry flag is False. Please make sure your are '
                 'building and pushing to private registry.')
+        self._ensure_registry_login()
         self._logger.debug(self.client.images.build(
             path=os.path.realpath(dockerfile),
             buildargs=self.config['env'],
             tag=self.config['tag']))
         image = self.client.images.get(self.config['image'])
-        image.tag(
-            repository='{}/{}'.format(
-                self.config['registry_url'], self.config['repository']),
-            tag=self.config['tag'])
-        self._logger.debug(self.client.images.push(
-            '{}/{}'.format(
-                self.config['registry_url'], self.config['repository']),
-            tag=self.config['tag']))
+        image.tag(repository=self._repository_ref, tag=self.config['tag'])
+        self._consume_progress(self.client.images.push(
+            self._repository_ref, tag=self.config['tag'],
+            stream=True, decode=True))
 
     def exists(self, container_name: str) -> bool:
         """Check if container exists.
@@ -162,9 +412,53 @@ class AirflowRun(object):
         Args:
             container_name (str): container name.
         """
-        if container_name in [i.get('name') for i in self.list()]:
-            return True
-        return False
+        if container_name in self._snapshot_names:
+            return container_name in self._containers_snapshot
+        return any(
+            c.attrs['Names'][0].lstrip('/') == container_name
+            for c in self.client.containers.list(
+                sparse=True, filters={'name': container_name}))
+
+    @cached_property
+    def _containers_snapshot(self) -> dict:
+        """Running containers keyed by name, fetched once until invalidated.
+
+        Only containers whose name matches a supported service or the
+        configured postgresql/rabbitmq names are fetched; the daemon does
+        the filtering and sparse mode skips the per-container inspect.
+
+        Returns:
+            dict: container objects keyed by container name.
+        """
+        containers = self.client.containers.list(
+            sparse=True, filters={'name': sorted(self._snapshot_names)})
+        return {c.attrs['Names'][0].lstrip('/'): c for c in containers}
+
+    def _invalidate_snapshot(self):
+        """Drop the running containers snapshot after containers change."""
+        self.__dict__.pop('_containers_snapshot', None)
+
+    def _run_container(self, run_dict: dict):
+        """Run a container and invalidate the containers snapshot.
+
+        Args:
+            run_dict (dict): keyword arguments for containers.run.
+
+        Returns:
+            Container object when detached, container output otherwise.
+        """
+        self._logger.debug(
+            f"Running container {run_dict.get('name')} from "
+            f"{run_dict['image']}: {run_dict.get('command')}")
+        try:
+            return self.client.containers.run(**run_dict)
+        finally:
+            self._invalidate_snapshot()
+
+    def prune(self):
+        """Remove stopped containers."""
+        self.client.containers.prune()
+        self._invalidate_snapshot()
 
     def list(self) -> list:
         """List all containers
@@ -173,9 +467,39 @@ class AirflowRun(object):
             list of contianers.
         """
         return [
-            {"id": i.short_id, "name": i.name}
-            for i in self.client.containers.list()
-            if i.name in self.supported_services]
+            {"id": container.short_id, "name": name}
+            for name, container in self._containers_snapshot.items()
+            if self._service_name(name)]
+
+    def _service_name(self, container_name: str):
+        """Supported service a container belongs to.
+
+        Containers named `{service}` or `{service}_{n}` belong to
+        `{service}`.
+
+        Args:
+            container_name (str): container name.
+
+        Returns:
+            str: service name, None when the container is not a service.
+        """
+        if container_name in self._supported:
+            return container_name
+        prefix, _, suffix = container_name.rpartition('_')
+        if suffix.isdigit() and prefix in self._supported:
+            return prefix
+        return None
+
+    def _running_counts(self) -> dict:
+        """Count running containers per supported service name.
+
+        Returns:
+            dict: number of running containers keyed by service name.
+        """
+        return Counter(
+            service for service in map(
+                self._service_name, self._containers_snapshot)
+            if service)
 
     def kill(self, command):
         """Kill container by name.
@@ -183,276 +507,277 @@ class AirflowRun(object):
         Args:
             command (str): container name.
         """
-        for container in self.client.containers.list():
-            if container.name == command:
-                container.kill()
+        self.kill_all([command])
+
+    def kill_all(self, names: list):
+        """Kill containers by name in parallel.
+
+        Args:
+            names (list): list of container names.
+        """
+        snapshot = self._containers_snapshot
+        containers = []
+        for name in names:
+            if name in snapshot:
+                containers.append(snapshot[name])
+            elif name not in self._snapshot_names \
+                    and self._service_name(name) is None:
+                # Not covered by the snapshot filter: look it up directly.
+                container = self._get_running_container(name)
+                if container is not None:
+                    containers.append(container)
+        if not containers:
+            return
+        max_workers = min(len(containers), 8)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(self._kill_container, containers))
+        self._invalidate_snapshot()
+
+    def _get_running_container(self, name: str):
+        """Get a running container by exact name.
+
+        Args:
+            name (str): container name.
+
+        Returns:
+            Container object, None when no such container is running.
+        """
+        import docker
+        try:
+            container = self.client.containers.get(name)
+        except docker.errors.NotFound:
+            return None
+        return container if container.status == 'running' else None
+
+    @staticmethod
+    def _kill_container(container):
+        """Kill a container, ignoring containers that are already gone."""
+        import docker
+        try:
+            container.kill()
+        except docker.errors.NotFound:
+            pass
 
-    def _get_environment_variables(self):
-        """Get airflow environment variables.
+    def _build_environment(self) -> tuple:
+        """Build the airflow environment variables.
 
         Returns:
-            list: list of environment variables to be passed to docker run.
+            tuple: environment variables to be passed to docker run.
         """
         env = self.config['env']
-        environment = [
-            "{}={}".format(k, v) for k, v in env.items()
-        ]
+        environment = [f"{k}={v}" for k, v in env.items()]
         result_backend = env.get('AIRFLOW__CELERY__RESULT_BACKEND')
         conn_str = env.get('AIRFLOW__CORE__SQL_ALCHEMY_CONN')
         if not conn_str or not result_backend:
             environment.append(
-                ("AIRFLOW__CORE__SQL_ALCHEMY_CONN="
-                 "postgresql+psycopg2://{}:{}@{}:{}/postgres").format(
-                    self.config['postgresql']['username'],
-                    self.config['postgresql']['password'],
-                    self.config['postgresql']['host'],
-                    self.config['postgresql']['port']
-                ))
+                f"AIRFLOW__CORE__SQL_ALCHEMY_CONN={self._pg_url}")
             environment.append(
-                ("AIRFLOW__CELERY__RESULT_BACKEND="
-                 "db+postgresql://{}:{}@{}:{}/postgres").format(
-                    self.config['postgresql']['username'],
-                    self.config['postgresql']['password'],
-                    self.config['postgresql']['host'],
-                    self.config['postgresql']['port']
-                ))
-        if 'AIRFLOW__CELERY__BROKER_URL' not in env.items():
+                f"AIRFLOW__CELERY__RESULT_BACKEND={self._celery_backend_url}")
+        if 'AIRFLOW__CELERY__BROKER_URL' not in env:
             environment.append(
-                ("AIRFLOW__CELERY__BROKER_URL="
-                 "pyamqp://{}:{}@{}:{}/{}").format(
-                    self.config['rabbitmq']['username'],
-                    self.config['rabbitmq']['password'],
-                    self.config['rabbitmq']['host'],
-                    self.config['rabbitmq']['port'],
-                    self.config['rabbitmq']['virtual_host']
-                ))
-        return environment
-
-    def get_docker_run_command(self, bash_command: list, ports: list = []):
-        env = self.config['env']
-        command = (
-            'docker run -d {env} {volumes} {ports} {registry_url}/{repository}:{tag} {bash_command}').format(
-            env=' '.join(['--env {}'.format(i)
-                          for i in self._get_environment_variables()]),
-            volumes=' '.join(['-v {}:{}'.format(i['host_path'], i['container_path'])
-                              for i in self.config['custom_mount_volumes']]),
-            ports=' '.join(['-p {}:{}'.format(p[0], p[1]) for p in ports]),
-            image=self.config['image'],
-            registry_url=self.config['registry_url'],
-            repository=self.config['repository'],
-            tag=self.config['tag'],
-            bash_command=' '.join(bash_command))
-        self._logger.debug('Running command: \n\n{}\n\n'.format(command))
-        return command
+                f"AIRFLOW__CELERY__BROKER_URL={self._broker_url}")
+        return tuple(environment)
 
-    def _get_run_dict(self, name: str, command: list, ports=[], detach=True):
-        """Get dictionary input for containers.run method.
+    @cached_property
+    def _volumes(self) -> dict:
+        """Volumes mounted into airflow containers, built once per instance.
 
-        Args:
-            name (str): name of container.
-            command (list): list of string of commands.
-            ports (list[optional]): list of int of port value.
-            detach (bool[optional]): True for detaching container.
+        Returns:
+            dict: volumes mapping to be passed to containers.run.
         """
-
         env = self.config['env']
+        local_dir = self.config['local_dir']
         volumes = {
-            '{}/dags'.format(self.config['local_dir']): {
+            f'{local_dir}/dags': {
                 'bind': env['AIRFLOW__CORE__DAGS_FOLDER'],
                 'mode': 'rw'
             },
-            '{}/logs'.format(self.config['local_dir']): {
+            f'{local_dir}/logs': {
                 'bind': env['AIRFLOW__CORE__BASE_LOG_FOLDER'],
                 'mode': 'rw'
             }
         }
-        if 'custom_mount_volumes' in self.config and len(
-                self.config['custom_mount_volumes']) > 0:
-            for custom_mount_volume in self.config['custom_mount_volumes']:
-                assert 'host_path' in custom_mount_volume
-                assert 'container_path' in custom_mount_volume
-                volumes_to_be_deleted = []
-                for k, v in volumes.items():
-                    if v['bind'] == custom_mount_volume['container_path']:
-                        volumes_to_be_deleted.append(k)
-                for volume_to_be_deleted in volumes_to_be_deleted:
-                    del volumes[volume_to_be_deleted]
-                volumes[custom_mount_volume['host_path']] = {
-                    'bind': custom_mount_volume['container_path'],
-                    'mode': 'rw'
-                }
+        custom_mount_volumes = self.config.get('custom_mount_volumes') or []
+        host_by_bind = {v['bind']: k for k, v in volumes.items()}
+        for custom_mount_volume in custom_mount_volumes:
+            assert 'host_path' in custom_mount_volume
+            assert 'container_path' in custom_mount_volume
+            container_path = custom_mount_volume['container_path']
+            host_path = custom_mount_volume['host_path']
+            existing = host_by_bind.pop(container_path, None)
+            if existing is not None:
+                del volumes[existing]
+            if host_path in volumes:
+                # The mount this host path had is replaced below.
+                del host_by_bind[volumes[host_path]['bind']]
+            volumes[host_path] = {
+                'bind': container_path,
+                'mode': 'rw'
+            }
+            host_by_bind[container_path] = host_path
+        return volumes
+
+    def _get_run_dict(self, name: str, command: list, ports=[], detach=True):
+        """Get dictionary input for containers.run method.
+
+        Args:
+            name (str): name of container, None for a generated name.
+            command (list): list of string of commands.
+            ports (list[optional]): list of int of port value.
+            detach (bool[optional]): True for detaching container.
+        """
         output = dict(
-            image='{registry_url}/{repository}:{tag}'.format(
-                registry_url=self.config['registry_url'],
-                repository=self.config['repository'],
-                tag=self.config['tag']),
+            image=self._image_ref,
             name=name,
             auto_remove=True,
             detach=detach,
-            environment=self._get_environment_variables(),
-            volumes=volumes,
+            environment=self._full_env,
+            volumes=self._volumes,
             command=command)
         if ports:
-            ports_dic = {}
-            for p in ports:
-                if type(p) == int:
-                    ports_dic['{}/tcp'.format(p)] = p
-                else:
-                    ports_dic['{}/tcp'.format(p.split(':')[0])
-                              ] = p.split(':')[1]
-            output.update(ports=ports_dic)
+            output.update(ports=dict(self._port_entry(p) for p in ports))
         return output
 
+    @staticmethod
+    def _port_entry(port) -> tuple:
+        """Convert a port into a containers.run ports entry.
+
+        Args:
+            port (int|str): port, or "container_port:host_port" string.
+
+        Returns:
+            tuple: ("{container_port}/tcp", host_port).
+        """
+        if isinstance(port, int):
+            return f'{port}/tcp', port
+        container_port, host_port = port.split(':', 1)
+        return f'{container_port}/tcp', host_port
+
     def start_postgresql(self, max_connections=10000):
         """Start postgres instance.
         """
-        os.system('docker pull {image}:{tag}'.format(
-            image=self.config['postgresql']['image'],
-            tag=self.config['postgresql']['tag']))
-        if self.exists(self.config['postgresql']['name']):
-            self._logger.debug('Container {} already exists.'.format(
-                self.config['postgresql']['name']
-            ))
+        pg = self.config['postgresql']
+        self._pull_image(pg['image'], pg.get('tag', 'latest'))
+        if self.exists(pg['name']):
+            self._logger.debug(f"Container {pg['name']} already exists.")
             return
         self._logger.info('Starting postgres...')
-        command = ('docker run -d {port} {env} {volumes} {image}:{tag} '
-                   '-c max_connections={max_connections}').format(
-            port='-p {port}:{port}'.format(
-                port=self.config['postgresql']['port']),
-            env=' '.join(
-                ['--env {}={}'.format(k, v)
-                 for k, v in self.config['postgresql']['env'].items()]),
-            volumes='-v {}/postgresql:{}'.format(
-                    self.config['local_dir'],
-                    self.config['postgresql']['data']),
-            image=self.config['postgresql']['image'],
-            tag=self.config['postgresql']['tag'],
-            max_connections=max_connections)
-        self._logger.debug('Running command: \n\n{}\n\n'.format(command))
-        os.system(command)
+        self._run_container(dict(
+            image=self._pg_image_ref,
+            name=pg['name'],
+            detach=True,
+            environment=self._pg_env,
+            volumes={
+                f"{self.config['local_dir']}/postgresql": {
+                    'bind': pg['data'],
+                    'mode': 'rw'
+                }
+            },
+            ports={f"{pg['port']}/tcp": pg['port']},
+            command=['-c', f'max_connections={max_connections}']))
 
     def start_postgres(self):
         return self.start_postgresql()
 
     def start_rabbitmq(self):
         """Docker run rabbitmq default image."""
-        if self.exists(self.config['rabbitmq']['name']):
-            self._logger.debug('Container {} already exists.'.format(
-                self.config['rabbitmq']['name']
-            ))
+        mq = self.config['rabbitmq']
+        if self.exists(mq['name']):
+            self._logger.debug(f"Container {mq['name']} already exists.")
             return
         self._logger.info('Starting rabbitmq...')
-        command = ('docker run -d {env} {volumes} {ports} {image}'.format(
-            env=(
-                ' '.join(['-e {}={}'.format(k, v)
-                          for k, v in self.config['rabbitmq']['env'].items()])),
-            volumes=(
-                '-v {}={}'.format(
-                    self.config['local_dir'],
-                    self.config['rabbitmq']['home'])),
-            ports='-p {ui_port}:{ui_port} -p {port}:{port}'.format(
-                ui_port=self.config['rabbitmq']['ui_port'],
-                port=self.config['rabbitmq']['port']),
-            image=self.config['rabbitmq']['image']
-        ))
-        self._logger.debug('Running command: \n\n{}\n\n'.format(command))
-        os.system(command)
-        self._logger.info(
-            'Rabbitmq UI url: {ip}:{port}'.format(
-                ip=self._ip, port=self.config['rabbitmq']['ui_port']))
-
-    def start_webserver(self, name='airflow_webserver', detach=True):
+        self._run_container(dict(
+            image=mq['image'],
+            name=mq['name'],
+            detach=True,
+            environment=self._mq_env,
+            volumes={
+                f"{self.config['local_dir']}/rabbitmq": {
+                    'bind': mq['home'],
+                    'mode': 'rw'
+                }
+            },
+            ports={
+                f"{mq['ui_port']}/tcp": mq['ui_port'],
+                f"{mq['port']}/tcp": mq['port']
+            }))
+        self._logger.info(f"Rabbitmq UI url: {self._ip}:{mq['ui_port']}")
+
+    @service_start()
+    def start_webserver(self, name='airflow_webserver', detach=True, *,
+                        running_count=0):
         """Docker run airflow webserver.
         Args:
             name (str): name of the container.
+            running_count (int): set by service_start, number of running
+                webserver containers.
             detach (bool[optional]): True for detach container.
         """
         self._logger.info('Starting webserver...')
-        running_workers = [
-            i.get('name') for i in self.list() if name in i['name']]
-        if len(running_workers) > 0:
-            name += '_{}'.format(len(running_workers))
-        self.check_required_connections(
-            [self.check_db_connection, self.check_rabbitmq_connection])
-        webserver_port = str(self.config['webserver_port'])
-        command = self.get_docker_run_command(
-            ["webserver", "-p", webserver_port],
-            ports=[(webserver_port, webserver_port)])
-        os.system(command)
-        self._logger.info(
-            'Webserver url: {ip}:{port}'.format(
-                ip=self._ip, port=self.config['webserver_port']))
+        webserver_port = int(self.config['webserver_port'])
+        self._run_container(self._get_run_dict(
+            name, ["webserver", "-p", str(webserver_port)],
+            ports=[webserver_port], detach=detach))
+        self._logger.info(f'Webserver url: {self._ip}:{webserver_port}')
 
     def start_airflow_webserver(self, **kwargs):
         self.start_webserver(**kwargs)
 
-    def start_scheduler(self, name='airflow_scheduler', detach=True):
+    @service_start()
+    def start_scheduler(self, name='airflow_scheduler', detach=True, *,
+                        running_count=0):
         """Docker run airflow scheduler.
         Args:
             name (str): name of the container.
+            running_count (int): set by service_start, number of running
+                scheduler containers.
             detach (bool[optional]): True for detach container.
 
         """
-        running_workers = [
-            i.get('name') for i in self.list() if name in i['name']]
-        if len(running_workers) > 0:
-            name += '_{}'.format(len(running_workers))
-        self.check_required_connections(
-            [self.check_db_connection, self.check_rabbitmq_connection])
-        command = self.get_docker_run_command(["scheduler"])
-        os.system(command)
+        self._run_container(self._get_run_dict(
+            name, ["scheduler"], detach=detach))
 
     def start_airflow_scheduler(self, **kwargs):
         return self.start_scheduler(**kwargs)
 
+    @service_start(suffix_offset=1)
     def start_worker(
             self, queue, port=8793, name='airflow_worker',
-            detach=True):
+            detach=True, *, running_count=0):
         """Docker run airflow worker.
         Args:
             name (str): name of the container.
+            running_count (int): set by service_start, number of running
+                worker containers.
             detach (bool[optional]): True for detach container.
             port (int): worker log server port.
         """
-        self._logger.info('Starting worker with queue: {}...'.format(queue))
-        running_workers = [
-            i.get('name') for i in self.list() if name in i['name']]
-        self._logger.info(f'Found workers: {running_workers}')
-        self.check_required_connections(
-            [self.check_db_connection, self.check_rabbitmq_connection])
-        if len(running_workers) > 0:
-            name += '_{}'.format(len(running_workers) + 1)
+        self._logger.info(f'Starting worker with queue: {queue}...')
+        self._logger.info(f'Found workers: {running_count}')
         if int(port) == 8793:
-            port = port + len(running_workers)
-        command = self.get_docker_run_command(
-            ["worker", "-q", queue],
-            ports=[(port, port)])
-        os.system(command)
+            port = port + running_count
+        self._run_container(self._get_run_dict(
+            name, ["worker", "-q", queue], ports=[int(port)], detach=detach))
 
     def start_airflow_worker(self, **kwargs):
         return self.start_worker(**kwargs)
 
-    def start_flower(self, name='airflow_flower', detach=True):
+    @service_start()
+    def start_flower(self, name='airflow_flower', detach=True, *,
+                     running_count=0):
         """Docker run airflow worker.
         Args:
             name (str): name of the container.
+            running_count (int): set by service_start, number of running
+                flower containers.
             detach (bool[optional]): True for detach container.
         """
         self._logger.info('Starting flower...')
-        running_workers = [
-            i.get('name') for i in self.list() if name in i['name']]
-        if len(running_workers) > 0:
-            name += '_{}'.format(len(running_workers))
-        self.check_required_connections(
-            [self.check_db_connection, self.check_rabbitmq_connection])
-        flower_port = str(self.config['flower_port'])
-        command = self.get_docker_run_command(
-            ["flower", "-p", flower_port],
-            ports=[(flower_port, flower_port)])
-        os.system(command)
-        self._logger.info(
-            'Flower url: {ip}:{port}'.format(
-                ip=self._ip, port=self.config['flower_port']))
+        flower_port = int(self.config['flower_port'])
+        self._run_container(self._get_run_dict(
+            name, ["flower", "-p", str(flower_port)],
+            ports=[flower_port], detach=detach))
+        self._logger.info(f'Flower url: {self._ip}:{flower_port}')
 
     def start_initdb(self, detach=False):
         """Docker run airflow initdb
@@ -460,20 +785,24 @@ class AirflowRun(object):
             detach (bool[optional]): True for detach container.
             echo (bool[optional]): True for printing out status.
         """
-
+        if self._initdb_done:
+            self._logger.debug('airflow initdb already ran.')
+            return
         self._logger.info('Running airflow initdb...')
         self.check_required_connections([self.check_db_connection])
-        self.client.containers.prune()
-        command = self.get_docker_run_command(["initdb"])
-        os.system(command)
+        self.prune()
+        self._run_container(self._get_run_dict(
+            None, ["initdb"], detach=detach))
+        self._initdb_done = True
 
     @staticmethod
     def generate_config():
         """Generate config yaml file
         """
+        from cryptography.fernet import Fernet
         path = os.path.join(os.path.dirname(__file__), 'config-template.yaml')
         with open(path, 'r') as fr:
-            content = yaml.safe_load(fr)
+            content = safe_load(fr)
             local_dir = input(
                 "Please enter local path which contains /dags and /logs: ")
             rabbitmq_host = input("Please enter rabbitmq host/ip: ")
@@ -495,11 +824,61 @@ class AirflowRun(object):
             content['postgresql']['env']['POSTGRES_USER'] = postgresql_username
             content['postgresql']['env']['POSTGRES_PASSWORD'] = postgresql_password
         with open('config.yaml', 'w') as fw:
-            yaml.dump(content, fw, default_flow_style=False,
+            safe_dump(content, fw, default_flow_style=False,
                       sort_keys=False)
         print('Created file: {}'.format(os.path.realpath('config.yaml')))
 
 
+def _run_worker(airflow_run, args):
+    airflow_run.start_initdb()
+    airflow_run.start_worker(queue=args.queue, port=int(args.port))
+
+
+def _run_postgresql(airflow_run, args):
+    airflow_run.start_postgresql()
+    airflow_run.start_initdb()
+
+
+def _run_rabbitmq(airflow_run, args):
+    airflow_run.start_rabbitmq()
+    airflow_run.start_initdb()
+
+
+def _run_webserver(airflow_run, args):
+    airflow_run.start_webserver()
+    airflow_run.start_initdb()
+
+
+def _run_scheduler(airflow_run, args):
+    airflow_run.start_scheduler()
+    airflow_run.start_initdb()
+
+
+def _run_flower(airflow_run, args):
+    airflow_run.start_flower()
+
+
+def _run_all(airflow_run, args):
+    airflow_run.start_postgresql()
+    airflow_run.start_initdb()
+    airflow_run.start_rabbitmq()
+    airflow_run.start_scheduler()
+    airflow_run.start_worker(queue=args.queue, port=int(args.port))
+    airflow_run.start_webserver()
+
+
+_RUN_HANDLERS = {
+    'worker': _run_worker,
+    'postgresql': _run_postgresql,
+    'postgres': _run_postgresql,
+    'rabbitmq': _run_rabbitmq,
+    'webserver': _run_webserver,
+    'scheduler': _run_scheduler,
+    'flower': _run_flower,
+    'all': _run_all,
+}
+
+
 def cli():
     parser = argparse.ArgumentParser(description='Airflow Run')
     parser.add_argument(
@@ -510,7 +889,7 @@ def cli():
         help='Path to the Dockerfile.')
     parser.add_argument(
         '--pull', dest='pull', action='store_true',
-        help='Pull latest image.')
+        help='Pull latest image, even if it is already present locally.')
     parser.add_argument(
         '--list', dest='list', action='store_true',
         help='List all running services.')
@@ -545,11 +924,11 @@ def cli():
         parser.print_help()
 
     if args.build:
-        airflow_run = AirflowRun(args.config, log=args.log)
         if not os.path.exists(args.config):
             raise Exception('--config path to config file is invalid.')
         if not args.dockerfile or not os.path.exists(args.dockerfile):
             raise Exception('--dockerfile path to Dockerfile is invalid.')
+        airflow_run = AirflowRun(args.config, log=args.log)
         airflow_run.build(os.path.dirname(args.dockerfile))
     elif args.generate_config:
         AirflowRun.generate_config()
@@ -569,8 +948,7 @@ def cli():
             print('c. Cancel.')
             choice = input('Choose one: ')
             if choice == 'a':
-                for i in running_services:
-                    airflow_run.kill(i['name'])
+                airflow_run.kill_all([i['name'] for i in running_services])
             elif choice == 'c':
                 return
             else:
@@ -579,39 +957,21 @@ def cli():
             print('No running service found.')
     elif args.run:
         airflow_run = AirflowRun(args.config, log=args.log)
-        airflow_run.client.containers.prune()
-        airflow_run.pull()
-        if args.run == "worker":
-            airflow_run.start_initdb()
-            airflow_run.start_worker(
-                queue=args.queue,
-                port=int(args.port))
-        elif args.run in ["postgresql", "postgres"]:
-            airflow_run.start_postgresql()
-            airflow_run.start_initdb()
-        elif args.run == "rabbitmq":
-            airflow_run.start_rabbitmq()
-            airflow_run.start_initdb()
-        elif args.run == "webserver":
-            airflow_run.start_webserver()
-            airflow_run.start_initdb()
-        elif args.run == "scheduler":
-            airflow_run.start_scheduler()
-            airflow_run.start_initdb()
-        elif args.run == "flower":
-            airflow_run.start_flower()
-        elif args.run == "all":
-            airflow_run.start_postgresql()
-            airflow_run.start_initdb()
-            airflow_run.start_rabbitmq()
-            airflow_run.start_initdb()
-            airflow_run.start_scheduler()
-            airflow_run.start_worker(
-                queue=args.queue,
-                port=int(args.port))
-            airflow_run.start_webserver()
+        handler = _RUN_HANDLERS.get(args.run)
+        if handler:
+            # Create the docker client before the threads share it.
+            airflow_run.connect()
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                pruned = executor.submit(airflow_run.prune)
+                pulled = executor.submit(airflow_run.pull, force=args.pull)
+                pruned.result()
+                pulled.result()
+            handler(airflow_run, args)
         else:
             print('\nAvailable services:')
             print('-------------------')
             for index, i in enumerate(airflow_run.supported_services):
                 print("{}. {}".format(index, i))
+    elif args.pull:
+        airflow_run = AirflowRun(args.config, log=args.log)
+        airflow_run.pull(force=True)
@@ -0,0 +1,5 @@
+cdef object _FORMATTER
+cdef object _LEAN_FORMATTER
+
+cpdef object logger_factory(str module_name=*, object handler=*,
+                            object level=*, bint verbose=*)
@@ -1,21 +1,170 @@
+import atexit
 import logging
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+import queue
+import threading
+import yaml
 
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+_FORMATTER = logging.Formatter(
+    '%(asctime)s %(levelname)s %(filename)s %(funcName)s.%(lineno)d: %(message)s')
+_LEAN_FORMATTER = logging.Formatter(
+    '%(asctime)s %(levelname)s %(name)s: %(message)s')
 
-def logger_factory(module_name=__name__, handler=None, level=logging.DEBUG):
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+if hasattr(logging, 'logAsyncioTasks'):  # Python >= 3.12
+    logging.logAsyncioTasks = False
+
+try:
+    from functools import cached_property
+except ImportError:  # Python < 3.8
+    class cached_property(object):
+        """Minimal backport of functools.cached_property."""
+
+        def __init__(self, func):
+            self.func = func
+            self.__doc__ = func.__doc__
+
+        def __set_name__(self, owner, name):
+            self.attrname = name
+
+        def __get__(self, instance, owner=None):
+            if instance is None:
+                return self
+            value = instance.__dict__[self.attrname] = self.func(instance)
+            return value
+
+
+class _LogListener(QueueListener):
+    """Single listener draining the queue shared by every logger.
+
+    Each queued item is a (handler, record) pair, so records only reach the
+    handler of the logger they were logged on.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.running = False
+
+    def start(self):
+        super().start()
+        self.running = True
+
+    def handle(self, item):
+        handler, record = item
+        if record.levelno >= handler.level:
+            handler.handle(record)
+
+    def stop(self):
+        self.running = False
+        super().stop()
+
+
+class _LogQueueHandler(QueueHandler):
+    """QueueHandler queueing records for `target` on the shared listener.
+
+    Records at WARNING and above wait until the queue is drained, so they
+    and everything logged before them are written before the caller goes
+    on to print or raise. Once the listener is stopped at exit, records are
+    written directly.
+    """
+
+    def __init__(self, target):
+        super().__init__(_log_queue)
+        self.target = target
+
+    def emit(self, record):
+        if _log_listener is None or not _log_listener.running:
+            if record.levelno >= self.target.level:
+                self.target.handle(record)
+                self.target.flush()
+            return
+        super().emit(record)
+
+    def enqueue(self, record):
+        self.queue.put_nowait((self.target, record))
+        if record.levelno >= logging.WARNING:
+            self.queue.join()
+
+
+_log_queue = queue.Queue()
+_log_listener = None
+_log_listener_lock = threading.Lock()
+
+
+def _start_log_listener():
+    """Start the shared log listener thread once per process."""
+    global _log_listener
+    with _log_listener_lock:
+        if _log_listener is None:
+            _log_listener = _LogListener(_log_queue)
+            _log_listener.start()
+            atexit.register(_log_listener.stop)
+
+
+def flush_logs():
+    """Block until every queued log record has been written.
+
+    Call before printing to the terminal so the output keeps its order
+    with log records logged earlier.
+    """
+    if _log_listener is not None and _log_listener.running:
+        _log_queue.join()
+
+
+def logger_factory(module_name=__name__, handler=None, level=logging.DEBUG,
+                   verbose=False):
     """Produce logger object.
 
+    The logger is configured only once; later calls for the same module
+    return it unchanged, whatever handler or level they pass. Records are
+    handed to the handler through a queue drained by a single background
+    listener thread shared by all loggers, so logging calls do not block
+    on the stream write. Records at WARNING and above are written before
+    the call returns.
+
     Args:
         handler (logging Handler): logging handler object.
         level (str): level of logging.
         module_name (str): name of the module.
+        verbose (bool): True for including file, function and line number
+            of the caller in each record.
     """
     logger = logging.getLogger(module_name)
+    for existing in logger.handlers:
+        if getattr(existing, '_airflow_run', False):
+            return logger
     logger.setLevel(level)
     if not handler:
         handler = logging.StreamHandler()
     handler.setLevel(level)
-    formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s %(filename)s %(funcName)s.%(lineno)d: %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    handler.setFormatter(_FORMATTER if verbose else _LEAN_FORMATTER)
+    _start_log_listener()
+    queue_handler = _LogQueueHandler(handler)
+    queue_handler._airflow_run = True
+    logger.addHandler(queue_handler)
+    logger.propagate = False
     return logger
+
+
+def safe_load(stream):
+    """Parse yaml with the libyaml safe loader when PyYAML was built with it.
+
+    Args:
+        stream (str|bytes|file): yaml document.
+    """
+    return yaml.load(stream, Loader=_YAML_LOADER)
+
+
+def safe_dump(data, stream=None, **kwargs):
+    """Dump yaml with the libyaml safe dumper when PyYAML was built with it.
+
+    Args:
+        data: object to serialize.
+        stream (file[optional]): file to write to, None to return a string.
+    """
+    return yaml.dump(data, stream, Dumper=_YAML_DUMPER, **kwargs)
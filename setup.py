@@ -1,6 +1,27 @@
+import os
+
 from setuptools import find_packages
 from setuptools import setup
 
+try:
+    from Cython.Build import cythonize
+except ImportError:  # plain source install
+    cythonize = None
+
+if cythonize:
+    # annotation_typing=False keeps the annotations as hints, as in the pure
+    # Python modules, instead of exact type checks on arguments and returns.
+    ext_modules = cythonize(
+        ['airflow_run/utils.py', 'airflow_run/run.py'],
+        language_level=3,
+        cache=os.path.join('build', 'cython-cache'),
+        compiler_directives={'annotation_typing': False})
+    # Fall back to the pure Python modules when there is no C compiler.
+    for ext_module in ext_modules:
+        ext_module.optional = True
+else:
+    ext_modules = []
+
 with open('README.rst') as file:
     long_description = file.read()
 
@@ -29,6 +50,7 @@ setup(name='airflow-run',
       author_email='paulo.kuong@gmail.com',
       license='MIT',
       packages=find_packages(exclude=["tests"]),
+      ext_modules=ext_modules,
       include_package_data=True,
       zip_safe=False,
       long_description=long_description,
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+import yaml
+
+from airflow_run.run import AirflowRun
+
+
+def make_config():
+    return {
+        'private_registry': False,
+        'registry_url': 'registry.hub.docker.com',
+        'username': '',
+        'password': '',
+        'repository': 'pkuong/airflow-run',
+        'image': 'airflow-run',
+        'tag': 'latest',
+        'local_dir': '/srv/airflow',
+        'webserver_port': 8000,
+        'flower_port': 5555,
+        'custom_mount_volumes': [],
+        'env': {
+            'AIRFLOW__CORE__EXECUTOR': 'CeleryExecutor',
+            'AIRFLOW__CORE__DAGS_FOLDER': '/usr/local/airflow/airflow/dags',
+            'AIRFLOW__CORE__BASE_LOG_FOLDER':
+                '/usr/local/airflow/airflow/logs',
+        },
+        'rabbitmq': {
+            'name': 'rabbitmq', 'username': 'mq', 'password': 'secret',
+            'host': 'mq.local', 'virtual_host': '/',
+            'image': 'rabbitmq:3-management', 'home': '/var/lib/rabbitmq',
+            'ui_port': 15672, 'port': 5672, 'env': {},
+        },
+        'postgresql': {
+            'name': 'postgresql', 'username': 'pg', 'password': 'secret',
+            'host': 'pg.local', 'image': 'postgres',
+            'data': '/var/lib/postgresql/data', 'port': 5432, 'env': {},
+        },
+    }
+
+
+class NotFound(Exception):
+    pass
+
+
+class ImageNotFound(NotFound):
+    pass
+
+
+# Stand-in for the docker package where only docker.errors is used.
+fake_docker = types.SimpleNamespace(errors=types.SimpleNamespace(
+    NotFound=NotFound, ImageNotFound=ImageNotFound))
+
+
+class FakeContainer(object):
+
+    def __init__(self, name, status='running'):
+        self.attrs = {'Names': ['/' + name]}
+        self.short_id = name
+        self.status = status
+
+
+class FakeContainers(object):
+    """Stand-in for docker's containers collection."""
+
+    def __init__(self, names=()):
+        self.running = [FakeContainer(name) for name in names]
+        self.others = {}
+        self.runs = []
+
+    def list(self, **kwargs):
+        return list(self.running)
+
+    def get(self, name):
+        if name in self.others:
+            return self.others[name]
+        raise NotFound(name)
+
+    def run(self, **kwargs):
+        self.runs.append(kwargs)
+        if kwargs.get('name'):
+            self.running.append(FakeContainer(kwargs['name']))
+
+    def prune(self):
+        pass
+
+
+class FakeClient(object):
+
+    def __init__(self, names=()):
+        self.containers = FakeContainers(names)
+
+
+class AirflowRunTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.config_path = os.path.join(self.tmp_dir, 'config.yaml')
+        self.write_config(make_config())
+        env = mock.patch.dict(os.environ, {
+            'XDG_CACHE_HOME': os.path.join(self.tmp_dir, 'cache'),
+            'AIRFLOWRUN_NO_CACHE': '1'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def write_config(self, config):
+        with open(self.config_path, 'w') as fw:
+            yaml.safe_dump(config, fw)
+
+    def airflow_run(self, names=()):
+        airflow_run = AirflowRun(self.config_path)
+        airflow_run.client = FakeClient(names)
+        airflow_run.check_required_connections = mock.Mock()
+        return airflow_run
@@ -0,0 +1,88 @@
+import os
+import stat
+import unittest
+from unittest import mock
+
+from airflow_run import run
+from airflow_run.run import AirflowRun
+from tests.base import AirflowRunTestCase
+from tests.base import make_config
+
+
+class ValidateYamlTest(AirflowRunTestCase):
+
+    def test_accepts_valid_config(self):
+        self.assertEqual(self.airflow_run().config['tag'], 'latest')
+
+    def test_missing_key(self):
+        config = make_config()
+        del config['flower_port']
+        self.write_config(config)
+        with self.assertRaisesRegex(ValueError, 'flower_port'):
+            AirflowRun(self.config_path)
+
+    def test_missing_section_key(self):
+        config = make_config()
+        del config['rabbitmq']['virtual_host']
+        self.write_config(config)
+        with self.assertRaisesRegex(ValueError, 'section "rabbitmq"'):
+            AirflowRun(self.config_path)
+
+    def test_wrong_types(self):
+        for section, key, value in (
+                (None, 'webserver_port', 'eighty'),
+                (None, 'webserver_port', True),
+                (None, 'private_registry', 'no'),
+                ('postgresql', 'env', []),
+                ('rabbitmq', 'port', None)):
+            config = make_config()
+            (config[section] if section else config)[key] = value
+            self.write_config(config)
+            with self.subTest(key=key, value=value):
+                with self.assertRaisesRegex(ValueError, key):
+                    AirflowRun(self.config_path)
+
+    def test_accepts_port_strings(self):
+        config = make_config()
+        config['webserver_port'] = '8080'
+        self.write_config(config)
+        AirflowRun(self.config_path)
+
+
+class ConfigCacheTest(AirflowRunTestCase):
+
+    def setUp(self):
+        super().setUp()
+        del os.environ['AIRFLOWRUN_NO_CACHE']
+        self.cache_path = run._config_cache_path(self.config_path)
+
+    def test_miss_writes_private_cache_file(self):
+        AirflowRun(self.config_path)
+        mode = stat.S_IMODE(os.stat(self.cache_path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+    def test_hit_skips_parsing_and_validation(self):
+        AirflowRun(self.config_path)
+        with mock.patch.object(run, 'safe_load') as load, \
+                mock.patch.object(AirflowRun, 'validate_yaml') as validate:
+            airflow_run = AirflowRun(self.config_path)
+        load.assert_not_called()
+        validate.assert_not_called()
+        self.assertEqual(airflow_run.config, make_config())
+
+    def test_changed_file_is_parsed_again(self):
+        AirflowRun(self.config_path)
+        config = make_config()
+        config['tag'] = 'v2.0'
+        self.write_config(config)
+        os.utime(self.config_path, ns=(0, 1))
+        self.assertEqual(AirflowRun(self.config_path).config['tag'], 'v2.0')
+
+    def test_no_cache_env(self):
+        os.environ['AIRFLOWRUN_NO_CACHE'] = '1'
+        AirflowRun(self.config_path)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import sys
+import unittest
+from unittest import mock
+
+from airflow_run import run
+from airflow_run.run import AirflowRun
+from tests.base import AirflowRunTestCase
+from tests.base import fake_docker
+from tests.base import FakeContainer
+
+
+class RunningContainersTest(AirflowRunTestCase):
+
+    names = (
+        'airflow_worker', 'airflow_worker_2', 'airflow_flower',
+        'postgresql', 'airflow_webserver_x', 'unrelated')
+
+    def test_running_counts(self):
+        self.assertEqual(self.airflow_run(self.names)._running_counts(), {
+            'airflow_worker': 2, 'airflow_flower': 1, 'postgresql': 1})
+
+    def test_list_includes_numbered_containers(self):
+        self.assertEqual(
+            [c['name'] for c in self.airflow_run(self.names).list()],
+            ['airflow_worker', 'airflow_worker_2', 'airflow_flower',
+             'postgresql'])
+
+    def test_kill_numbered_container(self):
+        airflow_run = self.airflow_run(self.names)
+        with mock.patch.object(AirflowRun, '_kill_container') as kill:
+            airflow_run.kill('airflow_worker_2')
+        self.assertEqual(
+            [c.args[0].short_id for c in kill.call_args_list],
+            ['airflow_worker_2'])
+
+    def kill(self, airflow_run, name):
+        with mock.patch.dict(sys.modules, {'docker': fake_docker}), \
+                mock.patch.object(AirflowRun, '_kill_container') as kill:
+            airflow_run.kill(name)
+        return [c.args[0].short_id for c in kill.call_args_list]
+
+    def test_kill_other_container_by_name(self):
+        airflow_run = self.airflow_run(self.names)
+        airflow_run.client.containers.others['my_app'] = FakeContainer(
+            'my_app')
+        self.assertEqual(self.kill(airflow_run, 'my_app'), ['my_app'])
+
+    def test_kill_skips_missing_and_stopped_containers(self):
+        airflow_run = self.airflow_run(self.names)
+        airflow_run.client.containers.others['stopped'] = FakeContainer(
+            'stopped', status='exited')
+        self.assertEqual(self.kill(airflow_run, 'stopped'), [])
+        self.assertEqual(self.kill(airflow_run, 'missing'), [])
+
+    def test_kill_service_name_uses_snapshot_only(self):
+        airflow_run = self.airflow_run(self.names)
+        airflow_run.client.containers.get = mock.Mock()
+        self.assertEqual(self.kill(airflow_run, 'airflow_worker_3'), [])
+        airflow_run.client.containers.get.assert_not_called()
+
+    def test_second_flower_gets_a_new_name(self):
+        airflow_run = self.airflow_run()
+        with mock.patch.object(run, '_resolve_ip', return_value='127.0.0.1'):
+            airflow_run.start_flower()
+            airflow_run.start_flower()
+        self.assertEqual(
+            [r['name'] for r in airflow_run.client.containers.runs],
+            ['airflow_flower', 'airflow_flower_1'])
+
+
+class StartServiceTest(AirflowRunTestCase):
+
+    def setUp(self):
+        super().setUp()
+        resolve_ip = mock.patch.object(
+            run, '_resolve_ip', return_value='127.0.0.1')
+        resolve_ip.start()
+        self.addCleanup(resolve_ip.stop)
+
+    def test_worker_positional_arguments(self):
+        airflow_run = self.airflow_run(['airflow_worker'])
+        airflow_run.start_worker('default', 8800)
+        run_dict = airflow_run.client.containers.runs[0]
+        self.assertEqual(run_dict['name'], 'airflow_worker_2')
+        self.assertEqual(run_dict['ports'], {'8800/tcp': 8800})
+        self.assertEqual(run_dict['command'], ['worker', '-q', 'default'])
+
+    def test_worker_default_port_moves_with_running_count(self):
+        airflow_run = self.airflow_run(['airflow_worker'])
+        airflow_run.start_worker('default')
+        self.assertEqual(
+            airflow_run.client.containers.runs[0]['ports'],
+            {'8794/tcp': 8794})
+
+    def test_checks_connections(self):
+        airflow_run = self.airflow_run()
+        airflow_run.start_scheduler()
+        airflow_run.check_required_connections.assert_called_once_with(
+            [airflow_run.check_db_connection,
+             airflow_run.check_rabbitmq_connection])
+
+
+if __name__ == '__main__':
+    unittest.main()
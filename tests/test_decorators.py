@@ -0,0 +1,118 @@
+import inspect
+import threading
+import time
+import unittest
+from unittest import mock
+
+from airflow_run import decorators
+from airflow_run.decorators import retry
+from airflow_run.decorators import service_start
+from airflow_run.decorators import stop_retries_on
+
+
+class RetryTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(decorators.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_without_sleeping_on_success(self):
+        self.assertEqual(retry(3)(lambda: 'ok')(), 'ok')
+        self.sleep.assert_not_called()
+
+    def test_sleeps_fibonacci_intervals_capped(self):
+        failing = mock.Mock(side_effect=ValueError('down'))
+        with mock.patch('builtins.print'):
+            with self.assertRaises(ValueError):
+                retry(9)(failing)()
+        self.assertEqual(failing.call_count, 10)
+        self.assertEqual(
+            [c.args[0] for c in self.sleep.call_args_list],
+            [1, 1, 2, 3, 5, 8, 13, 21, 30])
+
+    def test_recovers_after_failures(self):
+        flaky = mock.Mock(side_effect=[ValueError('down'), 'ok'])
+        with mock.patch('builtins.print') as printed:
+            self.assertEqual(retry(3, 'retrying')(flaky)(), 'ok')
+        printed.assert_called_once_with('retrying')
+        self.assertEqual(self.sleep.call_count, 1)
+
+
+class StopRetriesTest(unittest.TestCase):
+
+    def test_gives_up_once_stop_event_is_set(self):
+        stop = threading.Event()
+        calls = []
+
+        def failing():
+            calls.append(1)
+            stop.set()
+            raise ValueError('down')
+
+        with mock.patch('builtins.print'), stop_retries_on(stop):
+            with self.assertRaises(ValueError):
+                retry(7)(failing)()
+        self.assertEqual(len(calls), 1)
+
+    def test_wait_is_interrupted_by_stop_event(self):
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        failing = mock.Mock(side_effect=ValueError('down'))
+        started = time.monotonic()
+        with mock.patch('builtins.print'), stop_retries_on(stop):
+            with self.assertRaises(ValueError):
+                retry(7)(failing)()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(failing.call_count, 1)
+
+
+class FakeService(object):
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.checked = []
+
+    def _running_counts(self):
+        return self.counts
+
+    def check_db_connection(self):
+        pass
+
+    def check_rabbitmq_connection(self):
+        pass
+
+    def check_required_connections(self, checks):
+        self.checked.append(checks)
+
+    @service_start(suffix_offset=1)
+    def start(self, queue, port=1, name='svc', detach=True, *,
+              running_count=0):
+        return queue, port, name, detach, running_count
+
+
+class ServiceStartTest(unittest.TestCase):
+
+    def test_keeps_public_signature(self):
+        self.assertEqual(
+            list(inspect.signature(FakeService.start).parameters),
+            ['self', 'queue', 'port', 'name', 'detach'])
+
+    def test_positional_call_without_running_containers(self):
+        service = FakeService({})
+        self.assertEqual(service.start('q', 2), ('q', 2, 'svc', True, 0))
+        self.assertEqual(len(service.checked), 1)
+
+    def test_suffixes_name_with_running_count(self):
+        service = FakeService({'svc': 2})
+        self.assertEqual(service.start('q'), ('q', 1, 'svc_3', True, 2))
+        self.assertEqual(
+            service.start('q', name='other'), ('q', 1, 'other', True, 0))
+
+    def test_rejects_running_count_argument(self):
+        with self.assertRaises(TypeError):
+            FakeService({}).start('q', running_count=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import logging
+import threading
+import unittest
+import uuid
+
+from airflow_run.utils import flush_logs
+from airflow_run.utils import logger_factory
+
+
+class LoggerFactoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.name = 'airflow_run.tests.{}'.format(uuid.uuid4().hex)
+
+    def test_attaches_handler_once(self):
+        logger = logger_factory(self.name)
+        self.assertIs(logger_factory(self.name), logger)
+        self.assertEqual(len(logger.handlers), 1)
+        self.assertFalse(logger.propagate)
+
+    def test_later_calls_keep_level(self):
+        logger = logger_factory(self.name, level=logging.INFO)
+        logger_factory(self.name)
+        self.assertEqual(logger.level, logging.INFO)
+
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class LogQueueTest(unittest.TestCase):
+
+    def make_logger(self):
+        handler = ListHandler()
+        name = 'airflow_run.tests.{}'.format(uuid.uuid4().hex)
+        return logger_factory(name, handler=handler), handler
+
+    def test_warning_is_written_before_returning(self):
+        logger, handler = self.make_logger()
+        logger.info('first')
+        logger.warning('second')
+        self.assertEqual(handler.messages, ['first', 'second'])
+
+    def test_flush_logs_drains_queue(self):
+        logger, handler = self.make_logger()
+        for index in range(50):
+            logger.debug('record %d', index)
+        flush_logs()
+        self.assertEqual(
+            handler.messages, ['record {}'.format(i) for i in range(50)])
+
+    def test_records_reach_only_their_handler(self):
+        logger_a, handler_a = self.make_logger()
+        logger_b, handler_b = self.make_logger()
+        logger_a.info('a')
+        logger_b.info('b')
+        flush_logs()
+        self.assertEqual(handler_a.messages, ['a'])
+        self.assertEqual(handler_b.messages, ['b'])
+
+    def test_single_listener_thread(self):
+        self.make_logger()
+        threads = threading.active_count()
+        for _ in range(10):
+            self.make_logger()
+        self.assertEqual(threading.active_count(), threads)
+
+
+if __name__ == '__main__':
+    unittest.main()